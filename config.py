@@ -8,6 +8,10 @@ PUBMED_SEARCH_URL = f"{PUBMED_BASE_URL}/esearch.fcgi"
 PUBMED_FETCH_URL = f"{PUBMED_BASE_URL}/efetch.fcgi"
 PUBMED_SUMMARY_URL = f"{PUBMED_BASE_URL}/esummary.fcgi"
 
+# NCBI 請求頻率限制 (每秒請求數，有 API key 可提高至 10)
+NCBI_RATE_LIMIT = 3
+NCBI_RATE_LIMIT_WITH_KEY = 10
+
 # 搜尋策略 - 高品質臨床研究
 SEARCH_QUERIES = {
     "pediatric_nephrology": {
@@ -88,6 +92,10 @@ SEARCH_QUERIES = {
     }
 }
 
+# 查詢字串於載入時壓縮空白一次 (縮短請求 URL)
+for _query_info in SEARCH_QUERIES.values():
+    _query_info["query"] = " ".join(_query_info["query"].split())
+
 # 高品質期刊列表 (Impact Factor 較高的腎臟學相關期刊)
 HIGH_IMPACT_JOURNALS = [
     "N Engl J Med",
@@ -115,6 +123,7 @@ HIGH_IMPACT_JOURNALS = [
 # 搜尋參數
 DEFAULT_MAX_RESULTS = 50  # 每次搜尋最大結果數
 DEFAULT_DAYS_BACK = 7     # 預設搜尋過去幾天的文獻
+EFETCH_BATCH_SIZE = 200   # 每次 efetch 的 PMID 數量 (NCBI 建議值)
 
 # 研究趨勢關鍵詞
 TREND_KEYWORDS = {
@@ -142,6 +151,12 @@ TREND_KEYWORDS = {
 
 # 資料儲存路徑
 DATA_DIR = "data"
-ARTICLES_FILE = "articles.json"
+ARTICLES_FILE = "articles.db"  # SQLite，只保留最近一次抓取的文章
 SUMMARY_FILE = "weekly_summary.json"
 TRENDS_FILE = "trends.json"
+# 以下兩個快取不隨 data/ 提交 (已列入 .gitignore)；CI 以 actions/cache 在每週執行間保存
+HTTP_CACHE_FILE = "http_cache.json"  # ETag / Last-Modified 條件式請求快取
+HTTP_CACHE_MAX_AGE_DAYS = 7          # 超過此天數的回應不再保留
+HTTP_CACHE_MAX_ENTRIES = 200         # 最多保留的回應數 (超過時捨棄最舊的)
+PMID_CACHE_FILE = "pmid_cache"       # 已解析文章快取 (shelve，副檔名依 dbm 後端而定)
+PMID_CACHE_MAX_AGE_DAYS = 90         # 快取文章超過此天數即重新抓取
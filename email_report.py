@@ -4,12 +4,28 @@ Email 報告生成模組
 生成 HTML 格式的每週腎臟學研究摘要報告
 """
 
-import json
 import os
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from markupsafe import Markup, escape
+
 from config import DATA_DIR, SUMMARY_FILE
+from storage import load_json
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+TEMPLATE_CACHE_DIR = os.path.join(DATA_DIR, ".jinja_cache")
+REPORT_TEMPLATE = "report.html.j2"
+
+# PICO 欄位顯示標籤
+PICO_LABELS = [
+    ("P 族群", "P_族群"),
+    ("I 介入", "I_介入"),
+    ("C 對照", "C_對照"),
+    ("O 結果", "O_結果")
+]
 
 
 def generate_html_report(summary: Optional[dict] = None) -> str:
@@ -26,8 +42,7 @@ def generate_html_report(summary: Optional[dict] = None) -> str:
         summary_path = os.path.join(DATA_DIR, SUMMARY_FILE)
         if not os.path.exists(summary_path):
             return "<p>無可用的摘要資料</p>"
-        with open(summary_path, "r", encoding="utf-8") as f:
-            summary = json.load(f)
+        summary = load_json(summary_path)
 
     exec_summary = summary.get("執行摘要", {})
     category_stats = summary.get("分類統計", {})
@@ -37,374 +52,81 @@ def generate_html_report(summary: Optional[dict] = None) -> str:
 
     # 報告日期
     report_date = summary.get("報告日期", "")
-    try:
-        dt = datetime.fromisoformat(report_date)
-        formatted_date = dt.strftime("%Y年%m月%d日")
-    except (ValueError, TypeError):
-        formatted_date = datetime.now().strftime("%Y年%m月%d日")
-
-    html = f"""
-<!DOCTYPE html>
-<html lang="zh-TW">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>腎臟學研究週報 - {formatted_date}</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }}
-        .container {{
-            background-color: #ffffff;
-            border-radius: 10px;
-            padding: 30px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        .header {{
-            text-align: center;
-            border-bottom: 3px solid #1E3A5F;
-            padding-bottom: 20px;
-            margin-bottom: 30px;
-        }}
-        .header h1 {{
-            color: #1E3A5F;
-            margin: 0;
-            font-size: 28px;
-        }}
-        .header p {{
-            color: #666;
-            margin: 10px 0 0 0;
-        }}
-        .metrics {{
-            display: flex;
-            justify-content: space-around;
-            flex-wrap: wrap;
-            margin: 20px 0;
-            padding: 20px;
-            background-color: #f8f9fa;
-            border-radius: 8px;
-        }}
-        .metric {{
-            text-align: center;
-            padding: 10px 20px;
-        }}
-        .metric-value {{
-            font-size: 36px;
-            font-weight: bold;
-            color: #1E3A5F;
-        }}
-        .metric-label {{
-            font-size: 14px;
-            color: #666;
-        }}
-        .section {{
-            margin: 30px 0;
-        }}
-        .section h2 {{
-            color: #1E3A5F;
-            border-left: 4px solid #1E3A5F;
-            padding-left: 15px;
-            margin-bottom: 15px;
-        }}
-        .finding {{
-            background-color: #e8f4ea;
-            border-left: 4px solid #28a745;
-            padding: 10px 15px;
-            margin: 10px 0;
-            border-radius: 0 5px 5px 0;
-        }}
-        .article {{
-            border: 1px solid #e0e0e0;
-            border-radius: 8px;
-            padding: 15px;
-            margin: 15px 0;
-            background-color: #fafafa;
-        }}
-        .article-title {{
-            font-weight: bold;
-            color: #1E3A5F;
-            margin-bottom: 8px;
-        }}
-        .article-meta {{
-            font-size: 13px;
-            color: #666;
-        }}
-        .high-impact {{
-            display: inline-block;
-            background-color: #FFD700;
-            color: #333;
-            padding: 2px 8px;
-            border-radius: 4px;
-            font-size: 11px;
-            font-weight: bold;
-            margin-left: 10px;
-        }}
-        .trend-tag {{
-            display: inline-block;
-            background-color: #e3f2fd;
-            color: #1565c0;
-            padding: 3px 10px;
-            border-radius: 15px;
-            font-size: 12px;
-            margin: 3px;
-        }}
-        .idea {{
-            background-color: #fff3e0;
-            border-left: 4px solid #ff9800;
-            padding: 15px;
-            margin: 15px 0;
-            border-radius: 0 5px 5px 0;
-        }}
-        .idea-type {{
-            font-weight: bold;
-            color: #e65100;
-            margin-bottom: 5px;
-        }}
-        .pico-box {{
-            background-color: #f0f7ff;
-            border: 1px solid #b3d4fc;
-            border-radius: 8px;
-            padding: 12px;
-            margin: 10px 0;
-        }}
-        .pico-title {{
-            font-weight: bold;
-            color: #1565c0;
-            margin-bottom: 8px;
-            font-size: 14px;
-        }}
-        .pico-item {{
-            margin: 6px 0;
-            font-size: 13px;
-            line-height: 1.5;
-        }}
-        .pico-label {{
-            display: inline-block;
-            background-color: #1565c0;
-            color: white;
-            padding: 2px 8px;
-            border-radius: 4px;
-            font-weight: bold;
-            font-size: 11px;
-            margin-right: 8px;
-            min-width: 80px;
-            text-align: center;
-        }}
-        .chinese-summary {{
-            background-color: #fff8e1;
-            border-left: 4px solid #ffc107;
-            padding: 12px 15px;
-            margin: 10px 0;
-            border-radius: 0 8px 8px 0;
-            font-size: 13px;
-            line-height: 1.8;
-        }}
-        .chinese-summary-title {{
-            font-weight: bold;
-            color: #f57c00;
-            margin-bottom: 8px;
-        }}
-        .summary-section {{
-            margin: 8px 0;
-        }}
-        .summary-label {{
-            color: #e65100;
-            font-weight: bold;
-        }}
-        .footer {{
-            text-align: center;
-            margin-top: 30px;
-            padding-top: 20px;
-            border-top: 1px solid #e0e0e0;
-            color: #666;
-            font-size: 12px;
-        }}
-        a {{
-            color: #1565c0;
-            text-decoration: none;
-        }}
-        a:hover {{
-            text-decoration: underline;
-        }}
-        @media (max-width: 600px) {{
-            .metrics {{
-                flex-direction: column;
-            }}
-            .metric {{
-                margin: 10px 0;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>腎臟學研究週報</h1>
-            <p>{formatted_date} | 自動追蹤最新高品質腎臟學臨床研究</p>
-        </div>
-
-        <!-- 關鍵指標 -->
-        <div class="metrics">
-            <div class="metric">
-                <div class="metric-value">{exec_summary.get('總文章數', 0)}</div>
-                <div class="metric-label">總文章數</div>
-            </div>
-            <div class="metric">
-                <div class="metric-value">{exec_summary.get('高影響力期刊文章數', 0)}</div>
-                <div class="metric-label">高影響力期刊</div>
-            </div>
-            <div class="metric">
-                <div class="metric-value">{category_stats.get('兒童腎臟學', {}).get('文章數', 0)}</div>
-                <div class="metric-label">兒童腎臟學</div>
-            </div>
-            <div class="metric">
-                <div class="metric-value">{category_stats.get('成人腎臟學', {}).get('文章數', 0)}</div>
-                <div class="metric-label">成人腎臟學</div>
-            </div>
-        </div>
-
-        <!-- 主要發現 -->
-        <div class="section">
-            <h2>本週重點發現</h2>
-"""
-
-    # 主要發現
-    findings = exec_summary.get("主要發現", [])
-    if findings:
-        for finding in findings:
-            html += f'            <div class="finding">{finding}</div>\n'
+    # 上游固定輸出 ISO 格式 (YYYY-MM-DD...)，直接切片即可，不需完整解析
+    if (
+        isinstance(report_date, str)
+        and len(report_date) >= 10
+        and report_date[4] == "-"
+        and report_date[7] == "-"
+    ):
+        formatted_date = f"{report_date[:4]}年{report_date[5:7]}月{report_date[8:10]}日"
     else:
-        html += '            <div class="finding">本週暫無特別發現</div>\n'
-
-    html += """
-        </div>
-
-        <!-- 熱門研究主題 -->
-        <div class="section">
-            <h2>熱門研究主題</h2>
-            <div>
-"""
-
-    # 熱門主題
-    hot_topics = research_trends.get("熱門主題", [])[:10]
-    if hot_topics:
-        for topic, count in hot_topics:
-            html += f'                <span class="trend-tag">{topic} ({count})</span>\n'
-    else:
-        html += '                <p>本週暫無熱門主題</p>\n'
-
-    html += """
-            </div>
-        </div>
-
-        <!-- 重點文章 -->
-        <div class="section">
-            <h2>重點文章</h2>
-"""
-
-    # 重點文章
-    if featured_articles:
-        for article in featured_articles:
-            title = article.get("標題", "無標題")
-            journal = article.get("期刊", "N/A")
-            study_type = article.get("研究類型", "研究")
-            pub_date = article.get("發表日期", "")
-            is_high_impact = article.get("是否高影響力期刊", False)
-            pubmed_url = article.get("PubMed連結", "")
-            pico = article.get("PICO", {})
-            chinese_summary = article.get("中文摘要", "")
-
-            high_impact_badge = '<span class="high-impact">高影響力期刊</span>' if is_high_impact else ''
-
-            # PICO 格式 HTML
-            pico_html = ""
-            if pico and any(pico.values()):
-                pico_html = '<div class="pico-box"><div class="pico-title">PICO 格式分析</div>'
-                if pico.get("P_族群"):
-                    pico_html += f'<div class="pico-item"><span class="pico-label">P 族群</span>{pico["P_族群"]}</div>'
-                if pico.get("I_介入"):
-                    pico_html += f'<div class="pico-item"><span class="pico-label">I 介入</span>{pico["I_介入"]}</div>'
-                if pico.get("C_對照"):
-                    pico_html += f'<div class="pico-item"><span class="pico-label">C 對照</span>{pico["C_對照"]}</div>'
-                if pico.get("O_結果"):
-                    pico_html += f'<div class="pico-item"><span class="pico-label">O 結果</span>{pico["O_結果"]}</div>'
-                pico_html += '</div>'
-
-            # 中文摘要 HTML
-            summary_html = ""
-            if chinese_summary:
-                # 將換行轉換為 HTML
-                formatted_summary = chinese_summary.replace("\n\n", "</div><div class='summary-section'>").replace("\n", "<br>")
-                # 將【標題】轉換為粗體
-                formatted_summary = formatted_summary.replace("【", "<span class='summary-label'>").replace("】", "</span> ")
-                summary_html = f'''
-                <div class="chinese-summary">
-                    <div class="chinese-summary-title">中文摘要整理</div>
-                    <div class="summary-section">{formatted_summary}</div>
-                </div>'''
-
-            html += f"""
-            <div class="article">
-                <div class="article-title">
-                    {title}{high_impact_badge}
-                </div>
-                <div class="article-meta">
-                    {journal} | {study_type} | {pub_date}
-                    {f'<br><a href="{pubmed_url}" target="_blank">在 PubMed 查看</a>' if pubmed_url else ''}
-                </div>
-                {pico_html}
-                {summary_html}
-            </div>
-"""
-    else:
-        html += '            <p>本週暫無重點文章</p>\n'
-
-    html += """
-        </div>
-
-        <!-- 研究想法 -->
-        <div class="section">
-            <h2>研究想法建議</h2>
-"""
-
-    # 研究想法
-    if research_ideas:
-        for idea in research_ideas:
-            idea_type = idea.get("類型", "")
-            keyword = idea.get("關鍵詞", "")
-            content = idea.get("想法", "").replace("\n", "<br>")
-            suggested_type = idea.get("建議研究類型", "")
-
-            html += f"""
-            <div class="idea">
-                <div class="idea-type">[{idea_type}] {keyword}</div>
-                <p>{content}</p>
-                <p><strong>建議研究類型:</strong> {suggested_type}</p>
-            </div>
-"""
-    else:
-        html += '            <p>分析資料後將生成研究想法建議</p>\n'
-
-    html += f"""
-        </div>
-
-        <!-- 頁尾 -->
-        <div class="footer">
-            <p>此報告由 PubMed 腎臟學研究週報系統自動生成</p>
-            <p>報告時間: {formatted_date}</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
+        formatted_date = datetime.now().strftime("%Y年%m月%d日")
 
-    return html
+    context = {
+        "formatted_date": formatted_date,
+        "total_articles": exec_summary.get("總文章數", 0),
+        "high_impact_articles": exec_summary.get("高影響力期刊文章數", 0),
+        "pediatric_articles": category_stats.get("兒童腎臟學", {}).get("文章數", 0),
+        "adult_articles": category_stats.get("成人腎臟學", {}).get("文章數", 0),
+        "findings": exec_summary.get("主要發現", []),
+        "hot_topics": research_trends.get("熱門主題", [])[:10],
+        "featured_articles": [_prepare_article(article) for article in featured_articles],
+        "research_ideas": [
+            {
+                "type": idea.get("類型", ""),
+                "keyword": idea.get("關鍵詞", ""),
+                "content": escape(idea.get("想法", "")).replace("\n", Markup("<br>")),
+                "suggested_type": idea.get("建議研究類型", "")
+            }
+            for idea in research_ideas
+        ]
+    }
+
+    return _get_template_env().get_template(REPORT_TEMPLATE).render(**context)
+
+
+def _prepare_article(article: dict) -> dict:
+    """整理單篇重點文章的模板資料"""
+    pico = article.get("PICO", {}) or {}
+
+    # 中文摘要: 段落以 summary-section 分隔，【標題】轉換為粗體
+    chinese_summary = article.get("中文摘要", "")
+    if chinese_summary:
+        chinese_summary = (
+            escape(chinese_summary)
+            .replace("\n\n", Markup("</div><div class='summary-section'>"))
+            .replace("\n", Markup("<br>"))
+            .replace("【", Markup("<span class='summary-label'>"))
+            .replace("】", Markup("</span> "))
+        )
+
+    return {
+        "title": article.get("標題", "無標題"),
+        "journal": article.get("期刊", "N/A"),
+        "study_type": article.get("研究類型", "研究"),
+        "pub_date": article.get("發表日期", ""),
+        "is_high_impact": article.get("是否高影響力期刊", False),
+        "pubmed_url": article.get("PubMed連結", ""),
+        "pico_items": [
+            (label, pico[key]) for label, key in PICO_LABELS if pico.get(key)
+        ],
+        "chinese_summary": chinese_summary
+    }
+
+
+@lru_cache(maxsize=None)
+def _get_template_env() -> Environment:
+    """建立 Jinja2 環境 (模板編譯結果快取於磁碟，跨次執行重用)"""
+    os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    return Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+    )
 
 
 def save_html_report(html: str, filepath: Optional[str] = None) -> str:
@@ -5,14 +5,13 @@
 """
 
 import argparse
-import json
 import os
 import sys
 from datetime import datetime
 
 from pubmed_fetcher import PubMedFetcher
 from research_analyzer import ResearchAnalyzer
-from config import DATA_DIR
+from config import DATA_DIR, ARTICLES_FILE
 
 
 def main():
@@ -75,7 +74,7 @@ def main():
         sys.exit(1)
 
     # 儲存文章
-    articles_path = os.path.join(args.output_dir, "articles.json")
+    articles_path = os.path.join(args.output_dir, ARTICLES_FILE)
     fetcher.save_articles(articles, articles_path)
 
     # 分析文章
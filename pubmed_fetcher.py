@@ -4,21 +4,55 @@ PubMed API 整合模組
 """
 
 import requests
-import xml.etree.ElementTree as ET
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Iterator, Optional
+import threading
 import time
 import json
+import hashlib
+import io
 import os
-import re
+import shelve
 
+from storage import load_json, save_json, save_articles_db, load_articles_db
 from config import (
-    PUBMED_SEARCH_URL, PUBMED_FETCH_URL,
+    PUBMED_SEARCH_URL, PUBMED_FETCH_URL, PUBMED_SUMMARY_URL,
+    NCBI_RATE_LIMIT, NCBI_RATE_LIMIT_WITH_KEY,
     SEARCH_QUERIES, HIGH_IMPACT_JOURNALS,
-    DEFAULT_MAX_RESULTS, DEFAULT_DAYS_BACK,
-    DATA_DIR, ARTICLES_FILE
+    DEFAULT_MAX_RESULTS, DEFAULT_DAYS_BACK, EFETCH_BATCH_SIZE,
+    DATA_DIR, ARTICLES_FILE, HTTP_CACHE_FILE,
+    HTTP_CACHE_MAX_AGE_DAYS, HTTP_CACHE_MAX_ENTRIES,
+    PMID_CACHE_FILE, PMID_CACHE_MAX_AGE_DAYS
 )
 
+# 高影響力期刊 (小寫)，以 ISO 縮寫或期刊全名完全比對
+# 子字串比對會誤判，例如 "J Pediatr" 會命中 "J Pediatr Surg"
+_HI_SET = frozenset(journal.lower() for journal in HIGH_IMPACT_JOURNALS)
+
+
+def _xpath(expression: str) -> ET.XPath:
+    """編譯 XPath (smart_strings=False: 回傳一般 str，不保留對 XML 樹的參照)"""
+    return ET.XPath(expression, smart_strings=False)
+
+
+# 文章欄位的 XPath (載入時編譯一次，皆以 PubmedArticle 為起點的直接路徑)
+_XP_HAS_ARTICLE = _xpath("boolean(MedlineCitation/Article)")
+_XP_PMID = _xpath("string(MedlineCitation/PMID)")
+_XP_TITLE = _xpath("string(MedlineCitation/Article/ArticleTitle)")
+_XP_ABSTRACT_TEXTS = _xpath("MedlineCitation/Article/Abstract/AbstractText")
+_XP_AUTHORS = _xpath("MedlineCitation/Article/AuthorList/Author")
+_XP_JOURNAL_TITLE = _xpath("string(MedlineCitation/Article/Journal/Title)")
+_XP_JOURNAL_ISO = _xpath("string(MedlineCitation/Article/Journal/ISOAbbreviation)")
+_XP_PUB_DATE = _xpath("MedlineCitation/Article/Journal/JournalIssue/PubDate")
+_XP_PUB_TYPES = _xpath("MedlineCitation/Article/PublicationTypeList/PublicationType/text()")
+_XP_KEYWORDS = _xpath("MedlineCitation/KeywordList[1]/Keyword")
+_XP_MESH_TERMS = _xpath("MedlineCitation/MeshHeadingList/MeshHeading/DescriptorName/text()")
+_XP_DOI = _xpath("string(PubmedData/ArticleIdList/ArticleId[@IdType='doi'])")
+
 
 class PubMedFetcher:
     """PubMed 文獻抓取器"""
@@ -35,22 +69,134 @@ class PubMedFetcher:
         self.api_key = api_key or os.environ.get("NCBI_API_KEY")
         self.session = requests.Session()
 
+        # 連線重用 (keep-alive) 與自動重試，避免暫時性錯誤與重複的 TLS 交握
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET", "POST")
+            )
+        )
+        self.session.mount("https://", adapter)
+
+        # 各類別平行抓取時，共用同一個頻率限制以符合 NCBI 規範
+        rate_limit = NCBI_RATE_LIMIT_WITH_KEY if self.api_key else NCBI_RATE_LIMIT
+        self._min_interval = 1.0 / rate_limit
+        self._next_request_at = 0.0
+        self._rate_lock = threading.Lock()
+
+        # 條件式請求快取: 查詢結果未變更時 NCBI 回傳 304，直接重用上次的內容
+        self.http_cache_path = os.path.join(DATA_DIR, HTTP_CACHE_FILE)
+        self.http_cache = self._load_http_cache()
+        self._cache_lock = threading.Lock()
+        self._http_cache_dirty = False
+
+        # 已解析文章快取: 重複出現的 PMID 不必再次 efetch / 解析
+        self.pmid_cache_path = os.path.join(DATA_DIR, PMID_CACHE_FILE)
+        self._pmid_cache_lock = threading.Lock()
+
+    def _load_http_cache(self) -> dict:
+        """載入 ETag / Last-Modified 快取"""
+        if not os.path.exists(self.http_cache_path):
+            return {}
+
+        try:
+            return self._prune_http_cache(load_json(self.http_cache_path))
+        except (OSError, ValueError) as e:
+            print(f"HTTP 快取讀取失敗，將重新建立: {e}")
+            return {}
+
+    @staticmethod
+    def _prune_http_cache(cache: dict) -> dict:
+        """移除過期的回應，並只保留最新的 HTTP_CACHE_MAX_ENTRIES 筆"""
+        cutoff = (datetime.now() - timedelta(days=HTTP_CACHE_MAX_AGE_DAYS)).isoformat()
+        fresh = [
+            (key, entry) for key, entry in cache.items()
+            if isinstance(entry, dict) and entry.get("stored_at", "") >= cutoff
+        ]
+        fresh.sort(key=lambda item: item[1]["stored_at"], reverse=True)
+        return dict(fresh[:HTTP_CACHE_MAX_ENTRIES])
+
+    def save_http_cache(self):
+        """儲存 ETag / Last-Modified 快取 (每次抓取結束時寫入一次，沒有新回應時不寫入)"""
+        with self._cache_lock:
+            if not self._http_cache_dirty:
+                return
+            self.http_cache = self._prune_http_cache(self.http_cache)
+            self._http_cache_dirty = False
+            cache = dict(self.http_cache)
+
+        try:
+            os.makedirs(os.path.dirname(self.http_cache_path) or ".", exist_ok=True)
+            save_json(cache, self.http_cache_path, indent=False)
+        except OSError as e:
+            print(f"HTTP 快取寫入失敗: {e}")
+
+    def _throttle(self):
+        """等待至下一個可用的請求時段"""
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_request_at - now
+            self._next_request_at = max(now, self._next_request_at) + self._min_interval
+
+        if wait > 0:
+            time.sleep(wait)
+
+    @staticmethod
+    def _cache_key(url: str, params: dict) -> str:
+        """以 URL 與查詢參數計算快取鍵值"""
+        raw = json.dumps([url, sorted(params.items())], ensure_ascii=False, default=str)
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
     def _make_request(self, url: str, params: dict) -> requests.Response:
-        """發送 API 請求，包含重試邏輯"""
+        """發送 API 請求，包含重試邏輯與 ETag 條件式請求"""
+        # 快取鍵值不包含 email / api_key，有無 API key 的執行可共用快取
+        cache_key = self._cache_key(url, params)
+        cached = self.http_cache.get(cache_key)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
         params["email"] = self.email
         if self.api_key:
             params["api_key"] = self.api_key
 
-        for attempt in range(3):
-            try:
-                response = self.session.get(url, params=params, timeout=30)
-                response.raise_for_status()
-                return response
-            except requests.RequestException as e:
-                if attempt < 2:
-                    time.sleep(1 * (attempt + 1))
-                else:
-                    raise e
+        # id 列表過長時改用 POST，避免超過 URL 長度限制
+        use_post = len(str(params.get("id", ""))) > 2000
+
+        # 重試由 session 的 HTTPAdapter 處理 (見 __init__)
+        self._throttle()
+        if use_post:
+            response = self.session.post(url, data=params, headers=headers, timeout=30)
+        else:
+            response = self.session.get(url, params=params, headers=headers, timeout=30)
+
+        # 內容未變更，重用快取的回應內容
+        if response.status_code == 304 and cached:
+            response._content = cached["body"].encode("utf-8")
+            response.encoding = "utf-8"
+            return response
+
+        response.raise_for_status()
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self._cache_lock:
+                self.http_cache[cache_key] = {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "body": response.text,
+                    "stored_at": datetime.now().isoformat()
+                }
+                self._http_cache_dirty = True
+
         return response
 
     def search_articles(
@@ -94,6 +240,47 @@ class PubMedFetcher:
         pmids = data.get("esearchresult", {}).get("idlist", [])
         return pmids
 
+    def filter_high_impact_pmids(self, pmids: list[str]) -> list[str]:
+        """
+        以 esummary 的期刊名稱預先篩選高品質期刊的 PMID
+
+        esummary 只回傳書目摘要，比 efetch 完整 XML 小得多，
+        可避免抓取與解析之後會被丟棄的文章
+
+        Args:
+            pmids: PubMed ID 列表
+
+        Returns:
+            期刊屬於高品質期刊的 PMID 列表 (維持原順序)
+        """
+        keep = set()
+
+        try:
+            for start in range(0, len(pmids), EFETCH_BATCH_SIZE):
+                params = {
+                    "db": "pubmed",
+                    "id": ",".join(pmids[start:start + EFETCH_BATCH_SIZE]),
+                    "retmode": "json"
+                }
+
+                response = self._make_request(PUBMED_SUMMARY_URL, params)
+                result = response.json().get("result", {})
+
+                for pmid in result.get("uids", []):
+                    summary = result.get(pmid, {})
+                    if (
+                        summary.get("source", "").lower() in _HI_SET
+                        or summary.get("fulljournalname", "").lower() in _HI_SET
+                    ):
+                        keep.add(pmid)
+
+        except Exception as e:
+            # 預篩選失敗時不過濾，改由解析後的 is_high_impact 判斷
+            print(f"esummary 預篩選失敗: {e}")
+            return pmids
+
+        return [pmid for pmid in pmids if pmid in keep]
+
     def fetch_article_details(self, pmids: list[str]) -> list[dict]:
         """
         獲取文章詳細資訊
@@ -107,27 +294,73 @@ class PubMedFetcher:
         if not pmids:
             return []
 
-        params = {
-            "db": "pubmed",
-            "id": ",".join(pmids),
-            "retmode": "xml"
-        }
+        cached = self._load_cached_articles(pmids)
+        missing = [pmid for pmid in pmids if pmid not in cached]
+        if cached:
+            print(f"快取命中 {len(cached)} 篇，需抓取 {len(missing)} 篇")
 
-        response = self._make_request(PUBMED_FETCH_URL, params)
+        articles = []
+        fetched_at = datetime.now().isoformat()  # 同一次抓取的文章共用時間戳記
+
+        # 分批抓取，每批解析完即可釋放該批的 XML
+        for start in range(0, len(missing), EFETCH_BATCH_SIZE):
+            params = {
+                "db": "pubmed",
+                "id": ",".join(missing[start:start + EFETCH_BATCH_SIZE]),
+                "retmode": "xml"
+            }
 
-        # 解析 XML
-        articles = self._parse_xml_response(response.text)
-        return articles
+            response = self._make_request(PUBMED_FETCH_URL, params)
 
-    def _parse_xml_response(self, xml_text: str) -> list[dict]:
-        """解析 PubMed XML 回應"""
-        articles = []
+            # 解析 XML
+            articles.extend(self._parse_xml_response(response.content, fetched_at))
+
+        self._store_cached_articles(articles)
+
+        cached.update((article["pmid"], article) for article in articles)
+        return [cached[pmid] for pmid in pmids if pmid in cached]
+
+    def _open_pmid_cache(self) -> shelve.Shelf:
+        """開啟 PMID 快取 (不存在時自動建立)"""
+        os.makedirs(os.path.dirname(self.pmid_cache_path) or ".", exist_ok=True)
+        return shelve.open(self.pmid_cache_path)
+
+    def _load_cached_articles(self, pmids: list[str]) -> dict:
+        """從快取取出未過期的文章"""
+        cutoff = (datetime.now() - timedelta(days=PMID_CACHE_MAX_AGE_DAYS)).isoformat()
+        found = {}
 
         try:
-            root = ET.fromstring(xml_text)
+            with self._pmid_cache_lock, self._open_pmid_cache() as cache:
+                for pmid in pmids:
+                    article = cache.get(pmid)
+                    if article and article.get("fetched_at", "") >= cutoff:
+                        found[pmid] = article
+        except Exception as e:
+            print(f"PMID 快取讀取失敗: {e}")
+
+        return found
 
-            for article_elem in root.findall(".//PubmedArticle"):
-                article = self._parse_article(article_elem)
+    def _store_cached_articles(self, articles: list[dict]):
+        """將新解析的文章寫入快取"""
+        if not articles:
+            return
+
+        try:
+            with self._pmid_cache_lock, self._open_pmid_cache() as cache:
+                for article in articles:
+                    cache[article["pmid"]] = article
+        except Exception as e:
+            print(f"PMID 快取寫入失敗: {e}")
+
+    def _parse_xml_response(self, xml_content: bytes, fetched_at: Optional[str] = None) -> list[dict]:
+        """以串流方式解析 PubMed XML 回應"""
+        articles = []
+        if fetched_at is None:
+            fetched_at = datetime.now().isoformat()
+
+        try:
+            for article in self._iter_articles(io.BytesIO(xml_content), fetched_at):
                 if article:
                     articles.append(article)
 
@@ -136,96 +369,82 @@ class PubMedFetcher:
 
         return articles
 
-    def _parse_article(self, article_elem: ET.Element) -> Optional[dict]:
+    def _iter_articles(self, stream, fetched_at: str) -> Iterator[Optional[dict]]:
+        """逐篇解析 PubmedArticle，解析完即釋放，使記憶體中的樹維持扁平"""
+        context = ET.iterparse(
+            stream,
+            events=("end",),
+            tag="PubmedArticle",
+            huge_tree=True,
+            recover=True
+        )
+        for _, elem in context:
+            yield self._parse_article(elem, fetched_at)
+
+            # 釋放已解析文章的子節點，並移除前面已處理的兄弟節點
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    def _parse_article(self, article_elem: ET._Element, fetched_at: str) -> Optional[dict]:
         """解析單篇文章"""
         try:
-            medline = article_elem.find(".//MedlineCitation")
-            if medline is None:
+            if not _XP_HAS_ARTICLE(article_elem):
                 return None
 
-            pmid = medline.findtext(".//PMID", "")
-            article = medline.find(".//Article")
-            if article is None:
-                return None
+            pmid = _XP_PMID(article_elem)
 
             # 標題
-            title = article.findtext(".//ArticleTitle", "")
+            title = _XP_TITLE(article_elem)
 
             # 摘要
             abstract_parts = []
-            abstract_elem = article.find(".//Abstract")
-            if abstract_elem is not None:
-                for abstract_text in abstract_elem.findall(".//AbstractText"):
-                    label = abstract_text.get("Label", "")
-                    text = "".join(abstract_text.itertext())
-                    if label:
-                        abstract_parts.append(f"{label}: {text}")
-                    else:
-                        abstract_parts.append(text)
+            for abstract_text in _XP_ABSTRACT_TEXTS(article_elem):
+                label = abstract_text.get("Label", "")
+                text = ET.tostring(
+                    abstract_text, method="text", encoding="unicode", with_tail=False
+                )
+                if label:
+                    abstract_parts.append(f"{label}: {text}")
+                else:
+                    abstract_parts.append(text)
             abstract = " ".join(abstract_parts)
 
             # 作者
             authors = []
-            author_list = article.find(".//AuthorList")
-            if author_list is not None:
-                for author in author_list.findall(".//Author"):
-                    last_name = author.findtext("LastName", "")
-                    fore_name = author.findtext("ForeName", "")
-                    if last_name:
-                        authors.append(f"{last_name} {fore_name}".strip())
+            for author in _XP_AUTHORS(article_elem):
+                last_name = author.findtext("LastName", "")
+                fore_name = author.findtext("ForeName", "")
+                if last_name:
+                    authors.append(f"{last_name} {fore_name}".strip())
 
             # 期刊資訊
-            journal = article.find(".//Journal")
-            journal_title = ""
+            iso_abbrev = _XP_JOURNAL_ISO(article_elem)
+            journal_title = _XP_JOURNAL_TITLE(article_elem) or iso_abbrev
+            journal_title_lc = journal_title.lower()  # 期刊比對共用，只轉換一次
             pub_date = ""
-            if journal is not None:
-                journal_title = journal.findtext(".//Title", "")
-                if not journal_title:
-                    journal_title = journal.findtext(".//ISOAbbreviation", "")
-
-                pub_date_elem = journal.find(".//PubDate")
-                if pub_date_elem is not None:
-                    year = pub_date_elem.findtext("Year", "")
-                    month = pub_date_elem.findtext("Month", "")
-                    day = pub_date_elem.findtext("Day", "")
-                    pub_date = f"{year} {month} {day}".strip()
+            pub_date_elems = _XP_PUB_DATE(article_elem)
+            if pub_date_elems:
+                pub_date_elem = pub_date_elems[0]
+                year = pub_date_elem.findtext("Year", "")
+                month = pub_date_elem.findtext("Month", "")
+                day = pub_date_elem.findtext("Day", "")
+                pub_date = f"{year} {month} {day}".strip()
 
             # 文章類型
-            pub_types = []
-            for pub_type in article.findall(".//PublicationType"):
-                pub_types.append(pub_type.text)
+            pub_types = _XP_PUB_TYPES(article_elem)
 
             # 關鍵詞
-            keywords = []
-            keyword_list = medline.find(".//KeywordList")
-            if keyword_list is not None:
-                for kw in keyword_list.findall(".//Keyword"):
-                    if kw.text:
-                        keywords.append(kw.text)
+            keywords = [kw.text for kw in _XP_KEYWORDS(article_elem) if kw.text]
 
             # MeSH 詞彙
-            mesh_terms = []
-            mesh_list = medline.find(".//MeshHeadingList")
-            if mesh_list is not None:
-                for mesh in mesh_list.findall(".//MeshHeading"):
-                    descriptor = mesh.findtext(".//DescriptorName", "")
-                    if descriptor:
-                        mesh_terms.append(descriptor)
+            mesh_terms = _XP_MESH_TERMS(article_elem)
 
             # DOI
-            doi = ""
-            article_ids = article_elem.find(".//PubmedData/ArticleIdList")
-            if article_ids is not None:
-                for aid in article_ids.findall(".//ArticleId"):
-                    if aid.get("IdType") == "doi":
-                        doi = aid.text
-                        break
+            doi = _XP_DOI(article_elem)
 
             # 判斷是否為高品質期刊
-            is_high_impact = any(
-                hj.lower() in journal_title.lower()
-                for hj in HIGH_IMPACT_JOURNALS
-            )
+            is_high_impact = iso_abbrev.lower() in _HI_SET or journal_title_lc in _HI_SET
 
             return {
                 "pmid": pmid,
@@ -240,7 +459,7 @@ class PubMedFetcher:
                 "doi": doi,
                 "is_high_impact": is_high_impact,
                 "pubmed_url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
-                "fetched_at": datetime.now().isoformat()
+                "fetched_at": fetched_at
             }
 
         except Exception as e:
@@ -273,67 +492,87 @@ class PubMedFetcher:
             if category == "all"
             else [category]
         )
+        categories = [cat for cat in categories if cat in SEARCH_QUERIES]
+        if not categories:
+            return results
 
-        for cat in categories:
-            if cat not in SEARCH_QUERIES:
-                continue
-
-            query_info = SEARCH_QUERIES[cat]
-            print(f"正在搜尋: {query_info['name']}...")
-
-            # 搜尋文章
-            pmids = self.search_articles(
-                query_info["query"],
-                max_results=max_results,
-                days_back=days_back
-            )
-
-            print(f"找到 {len(pmids)} 篇文章")
+        # 各類別的 esearch + efetch 平行執行，請求頻率由 _throttle 控制
+        try:
+            with ThreadPoolExecutor(max_workers=len(categories)) as executor:
+                category_results = executor.map(
+                    lambda cat: self._fetch_category(cat, max_results, days_back, high_impact_only),
+                    categories
+                )
+                for cat, category_result in zip(categories, category_results):
+                    if category_result is not None:
+                        results[cat] = category_result
+        finally:
+            # 各類別的回應累積在記憶體中，全部抓取完才寫入一次
+            self.save_http_cache()
 
-            # 獲取詳細資訊
-            if pmids:
-                articles = self.fetch_article_details(pmids)
+        return results
 
-                # 過濾高品質期刊
-                if high_impact_only:
-                    articles = [a for a in articles if a.get("is_high_impact")]
+    def _fetch_category(
+        self,
+        cat: str,
+        max_results: int,
+        days_back: int,
+        high_impact_only: bool
+    ) -> Optional[dict]:
+        """搜尋並獲取單一類別的文章"""
+        query_info = SEARCH_QUERIES[cat]
+        print(f"正在搜尋: {query_info['name']}...")
+
+        # 搜尋文章
+        pmids = self.search_articles(
+            query_info["query"],
+            max_results=max_results,
+            days_back=days_back
+        )
 
-                results[cat] = {
-                    "name": query_info["name"],
-                    "name_en": query_info["name_en"],
-                    "topics": query_info["topics"],
-                    "articles": articles,
-                    "count": len(articles),
-                    "search_date": datetime.now().isoformat(),
-                    "days_back": days_back
-                }
+        print(f"{query_info['name']}: 找到 {len(pmids)} 篇文章")
 
-            # 避免過於頻繁的請求
-            time.sleep(0.5)
+        if not pmids:
+            return None
 
-        return results
+        # 只需高品質期刊時，先以 esummary 篩選，只 efetch 留下的文章
+        if high_impact_only:
+            pmids = self.filter_high_impact_pmids(pmids)
+            print(f"{query_info['name']}: 高品質期刊 {len(pmids)} 篇")
+
+        # 獲取詳細資訊
+        articles = self.fetch_article_details(pmids)
+
+        # 過濾高品質期刊 (以解析後的期刊資訊為準)
+        if high_impact_only:
+            articles = [a for a in articles if a.get("is_high_impact")]
+
+        return {
+            "name": query_info["name"],
+            "name_en": query_info["name_en"],
+            "topics": query_info["topics"],
+            "articles": articles,
+            "count": len(articles),
+            "search_date": datetime.now().isoformat(),
+            "days_back": days_back
+        }
 
     def save_articles(self, articles_data: dict, filepath: Optional[str] = None):
-        """儲存文章資料到 JSON 檔案"""
+        """儲存文章資料到 SQLite 資料庫"""
         if filepath is None:
             os.makedirs(DATA_DIR, exist_ok=True)
             filepath = os.path.join(DATA_DIR, ARTICLES_FILE)
 
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(articles_data, f, ensure_ascii=False, indent=2)
+        save_articles_db(articles_data, filepath)
 
         print(f"文章已儲存至: {filepath}")
 
     def load_articles(self, filepath: Optional[str] = None) -> dict:
-        """載入文章資料"""
+        """載入文章資料 (相容舊版 articles.json)"""
         if filepath is None:
             filepath = os.path.join(DATA_DIR, ARTICLES_FILE)
 
-        if not os.path.exists(filepath):
-            return {}
-
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return load_articles_db(filepath)
 
 
 def main():
@@ -3,19 +3,142 @@
 分析 PubMed 文獻，生成摘要，識別研究趨勢，提供研究想法
 """
 
+import hashlib
+import heapq
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from collections import Counter, defaultdict
-from typing import Optional
+from collections import Counter
+from typing import Iterator, Optional
 import re
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# google-re2: 線性時間比對 (不會災難性回溯)，比對時釋放 GIL，可多執行緒平行
+# 不支援前瞻/回溯參照，因此只用於 PICO 樣式，段落樣式仍用標準 re
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+from storage import load_articles_db, save_json
 from config import (
     TREND_KEYWORDS, DATA_DIR, SUMMARY_FILE, TRENDS_FILE,
     HIGH_IMPACT_JOURNALS
 )
 
 
+def _compile_patterns(patterns: tuple[str, ...]) -> tuple:
+    """
+    依優先順序編譯 PICO 樣式 (不區分大小寫)
+
+    已安裝 google-re2 時以 re2 編譯 (API 與 re 相容；其 \\d、\\s 僅比對 ASCII)
+    """
+    return tuple((re2 or re).compile("(?i)" + pattern) for pattern in patterns)
+
+
+# 以下樣式於載入時編譯一次，逐篇文章比對時不必重新解析
+
+# PICO 提取樣式 (依序嘗試，取第一個符合的樣式)
+# Population 提取模式
+_POPULATION_PATTERNS = _compile_patterns((
+    r"(?:patients?|subjects?|participants?|children|adults?|individuals?)\s+(?:with|who|having)\s+([^.]+?)(?:\.|,|were|was)",
+    r"(?:in|among)\s+(\d+[\d,]*\s*(?:patients?|subjects?|participants?|children|adults?)(?:[^.]{0,100}))",
+    r"(\d+[\d,]*\s*(?:patients?|subjects?|participants?|children|adults?)[^.]{0,50}(?:with|having)[^.]{0,100})",
+    r"(?:enrolled|included|recruited)\s+(\d+[^.]{0,150})",
+))
+
+# Intervention 提取模式
+_INTERVENTION_PATTERNS = _compile_patterns((
+    r"(?:received|treated with|administered|given|assigned to)\s+([^.]+?)(?:\.|,|versus|vs|compared|or placebo)",
+    r"(?:intervention|treatment)\s+(?:group|arm)?\s*(?:received|was|included)?\s*([^.]+?)(?:\.|,|versus|vs)",
+    r"(?:effect of|efficacy of|impact of)\s+([^.]+?)\s+(?:on|in|for)",
+))
+
+# Comparison 提取模式
+_COMPARISON_PATTERNS = _compile_patterns((
+    r"(?:compared (?:to|with)|versus|vs\.?)\s+([^.]+?)(?:\.|,|in terms)",
+    r"(?:control group|placebo group)\s*(?:received|was)?\s*([^.]*)",
+    r"(?:placebo|standard care|usual care|conventional treatment)",
+))
+
+# Outcome 提取模式
+_OUTCOME_PATTERNS = _compile_patterns((
+    r"(?:primary (?:outcome|endpoint)|main outcome)\s*(?:was|were|included)?\s*([^.]+)",
+    r"(?:measured|assessed|evaluated)\s+([^.]+?)(?:\.|,|using|by)",
+    r"(?:significantly|showed)\s+([^.]+?)(?:\.|,)",
+    r"(?:reduction|increase|improvement|decrease|change)\s+(?:in|of)\s+([^.]+?)(?:\.|,)",
+))
+
+# 結構化摘要段落樣式 (中文摘要與文章摘要共用，採較嚴格的段落標題以減少誤判)
+_SECTION_PATTERNS = tuple(
+    (re.compile(pattern, re.IGNORECASE | re.DOTALL), section_name)
+    for pattern, section_name in (
+        (r"BACKGROUND[:\s]*(.+?)(?=METHODS|OBJECTIVE|$)", "背景"),
+        (r"OBJECTIVE[S]?[:\s]*(.+?)(?=METHODS|RESULTS|$)", "目的"),
+        (r"METHODS[:\s]*(.+?)(?=RESULTS|$)", "方法"),
+        (r"RESULTS[:\s]*(.+?)(?=CONCLUSIONS?|DISCUSSION|$)", "結果"),
+        (r"CONCLUSIONS?[:\s]*(.+?)$", "結論"),
+    )
+)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# 疾病相關的 MeSH 詞彙 (PICO 族群補充用)
+_DISEASE_RE = re.compile(
+    r"disease|syndrome|disorder|injury|failure|nephro|kidney|renal", re.IGNORECASE
+)
+
+# 趨勢關鍵詞攤平為 (類別, 關鍵詞, 小寫關鍵詞)，逐篇比對時不必重複轉換
+_TREND_KEYWORD_ITEMS = tuple(
+    (category, keyword, keyword.lower())
+    for category, keywords in TREND_KEYWORDS.items()
+    for keyword in keywords
+)
+
+
+def _build_trend_matcher():
+    """
+    建立趨勢關鍵詞比對器，回傳文字中命中的關鍵詞索引
+
+    優先使用 Aho-Corasick 自動機 (pyahocorasick)，單次掃描即可找出所有關鍵詞；
+    未安裝時退回逐一以 in 檢查預先轉小寫的關鍵詞
+    """
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for index, (_, _, keyword_lower) in enumerate(_TREND_KEYWORD_ITEMS):
+            automaton.add_word(keyword_lower, index)
+        automaton.make_automaton()
+        return lambda text: {index for _, index in automaton.iter(text)}
+
+    # 關鍵詞不多時，C 層級的子字串搜尋比 regex 交替樣式快
+    indexed_keywords = tuple(
+        (index, keyword_lower)
+        for index, (_, _, keyword_lower) in enumerate(_TREND_KEYWORD_ITEMS)
+    )
+    return lambda text: {index for index, keyword_lower in indexed_keywords if keyword_lower in text}
+
+
+_match_trend_keywords = _build_trend_matcher()
+
+
+def _find_trend_keywords(text: str) -> list[tuple[str, str]]:
+    """
+    找出小寫文字中出現的趨勢關鍵詞
+
+    Returns:
+        (類別, 關鍵詞) 列表，依 TREND_KEYWORDS 的順序排列
+    """
+    return [
+        _TREND_KEYWORD_ITEMS[index][:2]
+        for index in sorted(_match_trend_keywords(text))
+    ]
+
+
 class ResearchAnalyzer:
     """研究分析器"""
 
@@ -28,19 +151,64 @@ class ResearchAnalyzer:
         """
         self.articles_data = articles_data or {}
 
-    def load_articles(self, filepath: str) -> None:
-        """載入文章資料"""
-        with open(filepath, "r", encoding="utf-8") as f:
-            self.articles_data = json.load(f)
+        # 扁平文章列表與趨勢分析的快取，依 articles_data 物件判斷是否仍有效
+        self._cache_source = None
+        self._cached_all_articles = None
+        self._cached_trends = None
+        self._trend_hits = {}  # PMID -> 命中的 (類別, 關鍵詞)，由 analyze_trends 記錄
 
-    def get_all_articles(self) -> list[dict]:
-        """獲取所有文章的扁平列表"""
-        all_articles = []
+    def load_articles(self, filepath: str) -> None:
+        """載入文章資料 (SQLite 資料庫或舊版 JSON 檔)"""
+        self.articles_data = load_articles_db(filepath)
+        self._invalidate_cache()
+
+    def _invalidate_cache(self) -> None:
+        """清除快取的分析結果"""
+        self._cache_source = self.articles_data
+        self._cached_all_articles = None
+        self._cached_trends = None
+        self._trend_hits = {}
+
+    def _check_cache(self) -> None:
+        """articles_data 被替換時清除快取"""
+        if self._cache_source is not self.articles_data:
+            self._invalidate_cache()
+
+    def articles_fingerprint(self) -> str:
+        """以各類別的 PMID 計算文章指紋，記錄於趨勢與摘要中，用來判斷是否需要重新分析"""
+        raw = "\n".join(sorted(
+            f"{category}:{article.get('pmid', '')}"
+            for article, category, _ in self.get_articles_iter()
+        ))
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def report_period(self) -> str:
+        """報告週期 (取自第一個類別的設定)"""
+        first_category = next(iter(self.articles_data), None)
+        if first_category is None:
+            return "N/A"
+        days_back = self.articles_data[first_category].get("days_back", 7)
+        return f"過去 {days_back} 天"
+
+    def get_articles_iter(self) -> Iterator[tuple[dict, str, str]]:
+        """逐一產生 (文章, 類別, 類別名稱)，不建立列表也不修改文章資料"""
         for category, data in self.articles_data.items():
+            category_name = data.get("name", category)
             for article in data.get("articles", []):
-                article["category"] = category
-                article["category_name"] = data.get("name", category)
-                all_articles.append(article)
+                yield article, category, category_name
+
+    def get_all_articles(self) -> list[dict]:
+        """獲取所有文章的扁平列表 (附加類別欄位的淺層複本，不修改原始資料)"""
+        self._check_cache()
+        if self._cached_all_articles is not None:
+            return self._cached_all_articles
+
+        all_articles = [
+            {**article, "category": category, "category_name": category_name}
+            for article, category, category_name in self.get_articles_iter()
+        ]
+
+        self._cached_all_articles = all_articles
         return all_articles
 
     def analyze_trends(self) -> dict:
@@ -50,14 +218,52 @@ class ResearchAnalyzer:
         Returns:
             趨勢分析結果
         """
+        self._check_cache()
+        if self._cached_trends is not None:
+            return self._cached_trends
+
         all_articles = self.get_all_articles()
         if not all_articles:
             return {}
 
+        # 單次走訪所有文章，同時累計各項統計
+        keyword_counts = Counter()  # (類別, 關鍵詞) -> 文章數
+        journal_counts = Counter()
+        pub_type_counts = Counter()
+        mesh_counts = Counter()
+        high_impact_count = 0
+
+        # 各類別的期刊與高影響力文章數也在同一次走訪中累計
+        category_journal_counts = {}
+        category_high_impact_counts = Counter()
+        trend_hits = {}
+
+        for category, data in self.articles_data.items():
+            category_journals = category_journal_counts[category] = Counter()
+
+            for article in data.get("articles", []):
+                if article.get("is_high_impact"):
+                    high_impact_count += 1
+                    category_high_impact_counts[category] += 1
+
+                # 趨勢關鍵詞
+                text = f"{article.get('title', '')} {article.get('abstract', '')}".lower()
+                hits = _find_trend_keywords(text)
+                for trend_category, keyword in hits:
+                    keyword_counts[(trend_category, keyword)] += 1
+                if article.get("pmid"):
+                    trend_hits[article["pmid"]] = hits
+
+                journal_counts[article.get("journal", "Unknown")] += 1
+                category_journals[article.get("journal", "")] += 1
+                pub_type_counts.update(article.get("pub_types", []))
+                mesh_counts.update(article.get("mesh_terms", []))
+
         trends = {
             "總文章數": len(all_articles),
-            "高影響力期刊文章數": sum(1 for a in all_articles if a.get("is_high_impact")),
+            "高影響力期刊文章數": high_impact_count,
             "分析日期": datetime.now().isoformat(),
+            "文章指紋": self.articles_fingerprint(),
             "趨勢關鍵詞統計": {},
             "熱門主題": [],
             "期刊分布": {},
@@ -66,52 +272,41 @@ class ResearchAnalyzer:
             "按類別統計": {}
         }
 
-        # 趨勢關鍵詞分析
-        keyword_counts = defaultdict(lambda: defaultdict(int))
-        for article in all_articles:
-            text = f"{article.get('title', '')} {article.get('abstract', '')}".lower()
-            for category, keywords in TREND_KEYWORDS.items():
-                for keyword in keywords:
-                    if keyword.lower() in text:
-                        keyword_counts[category][keyword] += 1
+        # 趨勢關鍵詞分析 (依類別分組，只在輸出時重組一次)
+        grouped_keyword_counts = {}
+        for (cat, kw), count in keyword_counts.items():
+            grouped_keyword_counts.setdefault(cat, {})[kw] = count
 
         trends["趨勢關鍵詞統計"] = {
             cat: dict(sorted(kws.items(), key=lambda x: x[1], reverse=True))
-            for cat, kws in keyword_counts.items()
+            for cat, kws in grouped_keyword_counts.items()
         }
 
-        # 熱門主題 (基於所有趨勢關鍵詞)
+        # 熱門主題 (基於所有趨勢關鍵詞，依類別順序累計以維持同分時的排序)
         all_keyword_counts = Counter()
-        for kws in keyword_counts.values():
+        for kws in grouped_keyword_counts.values():
             all_keyword_counts.update(kws)
         trends["熱門主題"] = all_keyword_counts.most_common(20)
 
         # 期刊分布
-        journal_counts = Counter(a.get("journal", "Unknown") for a in all_articles)
         trends["期刊分布"] = dict(journal_counts.most_common(15))
 
         # 文章類型分布
-        pub_type_counts = Counter()
-        for article in all_articles:
-            for pt in article.get("pub_types", []):
-                pub_type_counts[pt] += 1
         trends["文章類型分布"] = dict(pub_type_counts.most_common(10))
 
         # MeSH 詞彙頻率
-        mesh_counts = Counter()
-        for article in all_articles:
-            mesh_counts.update(article.get("mesh_terms", []))
         trends["MeSH詞彙頻率"] = dict(mesh_counts.most_common(30))
 
         # 按類別統計
         for category, data in self.articles_data.items():
-            articles = data.get("articles", [])
             trends["按類別統計"][data.get("name", category)] = {
-                "文章數": len(articles),
-                "高影響力期刊文章數": sum(1 for a in articles if a.get("is_high_impact")),
-                "主要期刊": dict(Counter(a.get("journal", "") for a in articles).most_common(5))
+                "文章數": len(data.get("articles", [])),
+                "高影響力期刊文章數": category_high_impact_counts[category],
+                "主要期刊": dict(category_journal_counts[category].most_common(5))
             }
 
+        self._cached_trends = trends
+        self._trend_hits = trend_hits
         return trends
 
     def extract_pico(self, article: dict) -> dict:
@@ -139,112 +334,78 @@ class ResearchAnalyzer:
             "O_結果": ""
         }
 
-        # Population 提取模式
-        population_patterns = [
-            r"(?:patients?|subjects?|participants?|children|adults?|individuals?)\s+(?:with|who|having)\s+([^.]+?)(?:\.|,|were|was)",
-            r"(?:in|among)\s+(\d+[\d,]*\s*(?:patients?|subjects?|participants?|children|adults?)(?:[^.]{0,100}))",
-            r"(\d+[\d,]*\s*(?:patients?|subjects?|participants?|children|adults?)[^.]{0,50}(?:with|having)[^.]{0,100})",
-            r"(?:enrolled|included|recruited)\s+(\d+[^.]{0,150})",
-        ]
-
-        for pattern in population_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                pico["P_族群"] = match.group(1).strip()[:200]
-                break
-
-        # Intervention 提取模式
-        intervention_patterns = [
-            r"(?:received|treated with|administered|given|assigned to)\s+([^.]+?)(?:\.|,|versus|vs|compared|or placebo)",
-            r"(?:intervention|treatment)\s+(?:group|arm)?\s*(?:received|was|included)?\s*([^.]+?)(?:\.|,|versus|vs)",
-            r"(?:effect of|efficacy of|impact of)\s+([^.]+?)\s+(?:on|in|for)",
-        ]
-
-        for pattern in intervention_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                pico["I_介入"] = match.group(1).strip()[:200]
-                break
-
-        # Comparison 提取模式
-        comparison_patterns = [
-            r"(?:compared (?:to|with)|versus|vs\.?)\s+([^.]+?)(?:\.|,|in terms)",
-            r"(?:control group|placebo group)\s*(?:received|was)?\s*([^.]*)",
-            r"(?:placebo|standard care|usual care|conventional treatment)",
-        ]
-
-        for pattern in comparison_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                result = match.group(1).strip() if match.lastindex else match.group(0).strip()
-                pico["C_對照"] = result[:200]
-                break
-
-        # Outcome 提取模式
-        outcome_patterns = [
-            r"(?:primary (?:outcome|endpoint)|main outcome)\s*(?:was|were|included)?\s*([^.]+)",
-            r"(?:measured|assessed|evaluated)\s+([^.]+?)(?:\.|,|using|by)",
-            r"(?:significantly|showed)\s+([^.]+?)(?:\.|,)",
-            r"(?:reduction|increase|improvement|decrease|change)\s+(?:in|of)\s+([^.]+?)(?:\.|,)",
-        ]
-
-        for pattern in outcome_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                pico["O_結果"] = match.group(1).strip()[:200]
-                break
+        for field, patterns in (
+            ("P_族群", _POPULATION_PATTERNS),
+            ("I_介入", _INTERVENTION_PATTERNS),
+            ("C_對照", _COMPARISON_PATTERNS),
+            ("O_結果", _OUTCOME_PATTERNS),
+        ):
+            for pattern in patterns:
+                match = pattern.search(text)
+                if match:
+                    result = match.group(1) if match.lastindex else match.group(0)
+                    pico[field] = result.strip()[:200]
+                    break
 
         # 如果沒提取到，從 MeSH 詞彙補充
         mesh_terms = article.get("mesh_terms", [])
         if not pico["P_族群"] and mesh_terms:
-            disease_terms = [m for m in mesh_terms if any(kw in m.lower() for kw in
-                ["disease", "syndrome", "disorder", "injury", "failure", "nephro", "kidney", "renal"])]
+            disease_terms = [m for m in mesh_terms if _DISEASE_RE.search(m)]
             if disease_terms:
                 pico["P_族群"] = f"患有 {', '.join(disease_terms[:2])} 的病人"
 
         return pico
 
-    def generate_chinese_summary(self, article: dict) -> str:
+    def _extract_sections(self, abstract: str) -> dict:
+        """從結構化摘要中提取各段落 (背景、目的、方法、結果、結論)"""
+        sections = {}
+        for pattern, section_name in _SECTION_PATTERNS:
+            match = pattern.search(abstract)
+            if match:
+                sections[section_name] = match.group(1).strip()
+        return sections
+
+    def _identify_study_type(self, pub_types: list[str], abstract_lower: str) -> str:
+        """依文章類型與 (已轉小寫的) 摘要判斷研究類型"""
+        if any("Randomized Controlled Trial" in pt for pt in pub_types):
+            return "隨機對照試驗"
+        if any("Meta-Analysis" in pt for pt in pub_types):
+            return "統合分析"
+        if any("Systematic Review" in pt for pt in pub_types):
+            return "系統性回顧"
+        if "cohort" in abstract_lower:
+            return "世代研究"
+        if "case-control" in abstract_lower:
+            return "病例對照研究"
+        return "研究"
+
+    def generate_chinese_summary(
+        self,
+        article: dict,
+        sections: Optional[dict] = None,
+        study_type: Optional[str] = None
+    ) -> str:
         """
         生成中文摘要
 
         Args:
             article: 文章資料
+            sections: 已提取的摘要段落 (可選，未提供時自行提取)
+            study_type: 已判斷的研究類型 (可選，未提供時自行判斷)
 
         Returns:
             中文摘要字串
         """
         abstract = article.get("abstract", "")
-        title = article.get("title", "")
-        pub_types = article.get("pub_types", [])
 
         # 識別研究類型
-        study_type = "本研究"
-        if any("Randomized Controlled Trial" in pt for pt in pub_types):
-            study_type = "本隨機對照試驗"
-        elif any("Meta-Analysis" in pt for pt in pub_types):
-            study_type = "本統合分析"
-        elif any("Systematic Review" in pt for pt in pub_types):
-            study_type = "本系統性回顧"
-        elif "cohort" in abstract.lower():
-            study_type = "本世代研究"
-        elif "case-control" in abstract.lower():
-            study_type = "本病例對照研究"
+        if study_type is None:
+            study_type = self._identify_study_type(article.get("pub_types", []), abstract.lower())
+        study_type = f"本{study_type}"
 
         # 提取各部分
-        sections = {}
-        section_patterns = [
-            (r"BACKGROUND[:\s]*(.+?)(?=METHODS|OBJECTIVE|AIM|PURPOSE|$)", "背景"),
-            (r"(?:OBJECTIVE|AIM|PURPOSE)[S]?[:\s]*(.+?)(?=METHODS|DESIGN|$)", "目的"),
-            (r"METHODS[:\s]*(.+?)(?=RESULTS|FINDINGS|$)", "方法"),
-            (r"(?:RESULTS|FINDINGS)[:\s]*(.+?)(?=CONCLUSIONS?|DISCUSSION|INTERPRETATION|$)", "結果"),
-            (r"(?:CONCLUSIONS?|INTERPRETATION)[:\s]*(.+?)$", "結論"),
-        ]
-
-        for pattern, section_name in section_patterns:
-            match = re.search(pattern, abstract, re.IGNORECASE | re.DOTALL)
-            if match:
-                sections[section_name] = match.group(1).strip()
+        if sections is None:
+            sections = self._extract_sections(abstract)
 
         # 建構中文摘要
         summary_parts = []
@@ -276,7 +437,7 @@ class ResearchAnalyzer:
     def _simplify_text(self, text: str, max_length: int = 300) -> str:
         """簡化文字，移除多餘空白並截斷"""
         # 移除多餘空白和換行
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WHITESPACE_RE.sub(' ', text).strip()
         # 截斷但保持句子完整
         if len(text) > max_length:
             # 在最大長度附近找句號
@@ -301,58 +462,40 @@ class ResearchAnalyzer:
         abstract = article.get("abstract", "")
 
         # 嘗試從結構化摘要中提取
-        sections = {}
-        section_patterns = [
-            (r"BACKGROUND[:\s]*(.+?)(?=METHODS|OBJECTIVE|$)", "背景"),
-            (r"OBJECTIVE[S]?[:\s]*(.+?)(?=METHODS|RESULTS|$)", "目的"),
-            (r"METHODS[:\s]*(.+?)(?=RESULTS|$)", "方法"),
-            (r"RESULTS[:\s]*(.+?)(?=CONCLUSIONS?|DISCUSSION|$)", "結果"),
-            (r"CONCLUSIONS?[:\s]*(.+?)$", "結論"),
-        ]
+        sections = self._extract_sections(abstract)
 
-        for pattern, section_name in section_patterns:
-            match = re.search(pattern, abstract, re.IGNORECASE | re.DOTALL)
-            if match:
-                sections[section_name] = match.group(1).strip()[:500]
+        # 識別研究類型 (摘要只轉一次小寫，與中文摘要、趨勢比對共用)
+        abstract_lower = abstract.lower()
+        study_type = self._identify_study_type(article.get("pub_types", []), abstract_lower)
 
-        # 識別研究類型
-        pub_types = article.get("pub_types", [])
-        study_type = "研究"
-        if any("Randomized Controlled Trial" in pt for pt in pub_types):
-            study_type = "隨機對照試驗"
-        elif any("Meta-Analysis" in pt for pt in pub_types):
-            study_type = "統合分析"
-        elif any("Systematic Review" in pt for pt in pub_types):
-            study_type = "系統性回顧"
-        elif any("Cohort" in abstract.lower() for _ in [1]):
-            study_type = "世代研究"
-        elif any("Case-Control" in abstract.lower() for _ in [1]):
-            study_type = "病例對照研究"
-
-        # 識別相關趨勢關鍵詞
-        text = f"{article.get('title', '')} {abstract}".lower()
-        related_trends = []
-        for category, keywords in TREND_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword.lower() in text:
-                    related_trends.append(f"{category}: {keyword}")
+        # 識別相關趨勢關鍵詞 (優先重用 analyze_trends 的比對結果)
+        self._check_cache()
+        hits = self._trend_hits.get(article.get("pmid"))
+        if hits is None:
+            text = f"{article.get('title', '').lower()} {abstract_lower}"
+            hits = _find_trend_keywords(text)
+        related_trends = [f"{category}: {keyword}" for category, keyword in hits[:5]]
 
         # 提取 PICO 格式
         pico = self.extract_pico(article)
 
         # 生成中文摘要
-        chinese_summary = self.generate_chinese_summary(article)
+        chinese_summary = self.generate_chinese_summary(article, sections, study_type)
 
         return {
             "pmid": article.get("pmid"),
+            "類別": article.get("category_name"),
             "標題": article.get("title"),
             "期刊": article.get("journal"),
             "發表日期": article.get("pub_date"),
             "研究類型": study_type,
             "PICO": pico,
             "中文摘要": chinese_summary,
-            "結構化摘要": sections if sections else {"完整摘要": abstract[:1000]},
-            "相關趨勢": related_trends[:5],
+            "結構化摘要": (
+                {name: text[:500] for name, text in sections.items()}
+                if sections else {"完整摘要": abstract[:1000]}
+            ),
+            "相關趨勢": related_trends,
             "關鍵詞": article.get("keywords", [])[:10],
             "MeSH詞彙": article.get("mesh_terms", [])[:10],
             "是否高影響力期刊": article.get("is_high_impact", False),
@@ -360,15 +503,25 @@ class ResearchAnalyzer:
             "DOI": article.get("doi")
         }
 
-    def generate_research_ideas(self) -> list[dict]:
+    def generate_research_ideas(
+        self,
+        trends: Optional[dict] = None,
+        all_articles: Optional[list[dict]] = None
+    ) -> list[dict]:
         """
         基於當前研究趨勢生成研究想法
 
+        Args:
+            trends: 趨勢分析結果 (可選，未提供時自行分析)
+            all_articles: 所有文章列表 (可選，未提供時自行取得)
+
         Returns:
             研究想法列表
         """
-        trends = self.analyze_trends()
-        all_articles = self.get_all_articles()
+        if trends is None:
+            trends = self.analyze_trends()
+        if all_articles is None:
+            all_articles = self.get_all_articles()
 
         ideas = []
 
@@ -480,18 +633,25 @@ class ResearchAnalyzer:
         """
         trends = self.analyze_trends()
         all_articles = self.get_all_articles()
-        research_ideas = self.generate_research_ideas()
+        research_ideas = self.generate_research_ideas(trends, all_articles)
 
-        # 選擇重點文章 (高影響力優先)
-        featured_articles = sorted(
+        # 選擇重點文章 (高影響力優先；只需前 10 篇，以 heap 選取取代完整排序)
+        featured_articles = heapq.nlargest(
+            10,
             all_articles,
-            key=lambda x: (x.get("is_high_impact", False), x.get("pub_date", "")),
-            reverse=True
-        )[:10]
+            key=lambda x: (x.get("is_high_impact", False), x.get("pub_date", ""))
+        )
+
+        # 各篇重點文章的摘要彼此獨立，平行生成
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(len(featured_articles), os.cpu_count() or 1))
+        ) as executor:
+            article_summaries = list(executor.map(self.generate_article_summary, featured_articles))
 
         summary = {
             "報告日期": datetime.now().isoformat(),
-            "報告週期": f"過去 {self.articles_data.get(list(self.articles_data.keys())[0], {}).get('days_back', 7)} 天" if self.articles_data else "N/A",
+            "報告週期": self.report_period(),
+            "文章指紋": self.articles_fingerprint(),
 
             "執行摘要": {
                 "總文章數": trends.get("總文章數", 0),
@@ -508,10 +668,7 @@ class ResearchAnalyzer:
                 "文章類型": trends.get("文章類型分布", {}),
             },
 
-            "重點文章": [
-                self.generate_article_summary(article)
-                for article in featured_articles
-            ],
+            "重點文章": article_summaries,
 
             "研究想法": research_ideas,
 
@@ -533,7 +690,7 @@ class ResearchAnalyzer:
         # 高影響力期刊
         high_impact = [a for a in articles if a.get("is_high_impact")]
         if high_impact:
-            journals = list(set(a.get("journal", "") for a in high_impact))[:3]
+            journals = list(dict.fromkeys(a.get("journal", "") for a in high_impact))[:3]
             findings.append(f"高影響力期刊發表 {len(high_impact)} 篇，包括: {', '.join(journals)}")
 
         # 研究類型分布
@@ -551,8 +708,7 @@ class ResearchAnalyzer:
             os.makedirs(DATA_DIR, exist_ok=True)
             filepath = os.path.join(DATA_DIR, SUMMARY_FILE)
 
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        save_json(summary, filepath)
 
         print(f"摘要已儲存至: {filepath}")
 
@@ -562,8 +718,7 @@ class ResearchAnalyzer:
             os.makedirs(DATA_DIR, exist_ok=True)
             filepath = os.path.join(DATA_DIR, TRENDS_FILE)
 
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(trends, f, ensure_ascii=False, indent=2)
+        save_json(trends, filepath)
 
         print(f"趨勢分析已儲存至: {filepath}")
 
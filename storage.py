@@ -0,0 +1,162 @@
+"""
+資料儲存模組
+JSON 檔案讀寫 (優先使用 orjson，未安裝時退回標準函式庫 json)
+與文章資料的 SQLite 儲存
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import closing
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 文章以 PMID 為鍵；類別表記錄最近一次抓取的結果與順序，未被引用的文章於儲存時刪除
+_ARTICLES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    pmid TEXT PRIMARY KEY,
+    json TEXT NOT NULL,
+    fetched_at TEXT,
+    is_high_impact INTEGER,
+    journal TEXT
+);
+CREATE TABLE IF NOT EXISTS categories (
+    category TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    json TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS category_articles (
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    pmid TEXT NOT NULL,
+    PRIMARY KEY (category, position)
+);
+CREATE INDEX IF NOT EXISTS idx_articles_fetched_at ON articles (fetched_at);
+CREATE INDEX IF NOT EXISTS idx_articles_journal ON articles (journal);
+"""
+
+
+def _dumps(data: Any, indent: bool = False) -> bytes:
+    """將資料編碼為 UTF-8 JSON"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+
+    return json.dumps(
+        data, ensure_ascii=False, indent=2 if indent else None
+    ).encode("utf-8")
+
+
+def _loads(content: Union[bytes, str]) -> Any:
+    """解碼 JSON"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def load_json(filepath: str) -> Any:
+    """載入 JSON 檔案"""
+    with open(filepath, "rb") as f:
+        return _loads(f.read())
+
+
+def save_json(data: Any, filepath: str, indent: bool = True) -> None:
+    """
+    以 UTF-8 儲存 JSON 檔案
+
+    Args:
+        data: 要儲存的資料
+        filepath: 檔案路徑
+        indent: 是否縮排 2 格 (方便閱讀與 diff)
+    """
+    content = _dumps(data, indent=indent)
+    with open(filepath, "wb") as f:
+        f.write(content)
+
+
+def save_articles_db(articles_data: dict, filepath: str) -> None:
+    """
+    將按類別組織的文章資料寫入 SQLite
+
+    文章以 PMID upsert，類別資訊與文章順序則以本次結果取代；
+    不再被任何類別引用的文章會一併刪除，資料庫只保留本次結果 (與舊版 articles.json 相同)
+
+    Args:
+        articles_data: fetch_nephrology_articles 回傳的類別字典
+        filepath: 資料庫檔案路徑
+    """
+    article_rows = {}
+    category_rows = []
+    membership_rows = []
+
+    for position, (category, data) in enumerate(articles_data.items()):
+        info = {key: value for key, value in data.items() if key != "articles"}
+        category_rows.append((category, position, _dumps(info).decode("utf-8")))
+
+        for article_position, article in enumerate(data.get("articles", [])):
+            pmid = article["pmid"]
+            membership_rows.append((category, article_position, pmid))
+            article_rows[pmid] = (
+                pmid,
+                _dumps(article).decode("utf-8"),
+                article.get("fetched_at"),
+                int(bool(article.get("is_high_impact"))),
+                article.get("journal")
+            )
+
+    with closing(sqlite3.connect(filepath)) as con:
+        con.executescript(_ARTICLES_SCHEMA)
+        with con:
+            con.executemany(
+                "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?)",
+                article_rows.values()
+            )
+            con.execute("DELETE FROM categories")
+            con.execute("DELETE FROM category_articles")
+            con.executemany("INSERT INTO categories VALUES (?, ?, ?)", category_rows)
+            con.executemany("INSERT INTO category_articles VALUES (?, ?, ?)", membership_rows)
+            con.execute(
+                "DELETE FROM articles WHERE pmid NOT IN (SELECT pmid FROM category_articles)"
+            )
+        # 回收刪除後的空間，避免每次提交的資料庫檔案持續變大
+        con.execute("VACUUM")
+
+
+def load_articles_db(filepath: str) -> dict:
+    """
+    載入文章資料，重組為按類別組織的字典 (與舊版 articles.json 格式相同)
+
+    若資料庫不存在但同名的舊版 .json 檔存在，則改為讀取 JSON (僅供尚未轉換的舊資料目錄使用)
+
+    Args:
+        filepath: 資料庫檔案路徑 (亦可直接傳入 .json 檔)
+
+    Returns:
+        按類別組織的文章字典
+    """
+    legacy_path = os.path.splitext(filepath)[0] + ".json"
+    if filepath.endswith(".json") or not os.path.exists(filepath):
+        return load_json(legacy_path) if os.path.exists(legacy_path) else {}
+
+    with closing(sqlite3.connect(filepath)) as con:
+        results = {}
+        for category, info in con.execute(
+            "SELECT category, json FROM categories ORDER BY position"
+        ):
+            results[category] = {**_loads(info), "articles": []}
+
+        for category, article in con.execute(
+            "SELECT ca.category, a.json FROM category_articles ca "
+            "JOIN articles a ON a.pmid = ca.pmid "
+            "ORDER BY ca.category, ca.position"
+        ):
+            if category in results:
+                results[category]["articles"].append(_loads(article))
+
+    return results
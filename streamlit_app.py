@@ -4,14 +4,19 @@
 """
 
 import streamlit as st
-import json
 import os
+from html import escape
 from datetime import datetime, timedelta
+from itertools import chain, islice
+from typing import Optional
+import altair as alt
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
-from pubmed_fetcher import PubMedFetcher
-from research_analyzer import ResearchAnalyzer
 from config import DATA_DIR, ARTICLES_FILE, SUMMARY_FILE, TRENDS_FILE
+from storage import load_articles_db, load_json
 
 # 頁面配置
 st.set_page_config(
@@ -77,33 +82,167 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def load_cached_data():
-    """載入快取的資料"""
+# 完整文章列表使用的欄位
+_ARTICLE_TABLE_SCHEMA = pa.schema([
+    ("title", pa.string()),
+    ("journal", pa.string()),
+    ("is_high_impact", pa.bool_()),
+    ("pub_date", pa.string()),
+    ("pmid", pa.string())
+])
+
+
+def _file_mtime(path: str) -> Optional[int]:
+    """取得檔案修改時間 (奈秒)，檔案不存在時為 None"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _featured_card_markdown(article: dict) -> str:
+    """
+    組合單篇重點文章的 Markdown/HTML 內容 (標題、期刊資訊、相關趨勢、連結)
+
+    文章欄位一律先跳脫 HTML，只有徽章與趨勢標籤的 <span> 為原始 HTML
+    """
+    title = escape(article.get("標題", "無標題"))
+    if article.get("是否高影響力期刊", False):
+        title += ' <span class="high-impact-badge">高影響力期刊</span>'
+
+    parts = [
+        f"#### {title}",
+        (
+            f"**期刊:** {escape(article.get('期刊', 'N/A'))} &nbsp;|&nbsp; "
+            f"**研究類型:** {escape(article.get('研究類型', 'N/A'))} &nbsp;|&nbsp; "
+            f"**發表日期:** {escape(article.get('發表日期', 'N/A'))}"
+        )
+    ]
+
+    related_trends = article.get("相關趨勢", [])
+    if related_trends:
+        trends_html = " ".join(
+            f'<span class="trend-tag">{escape(t)}</span>' for t in related_trends
+        )
+        parts.append(f"**相關趨勢:** {trends_html}")
+
+    links = []
+    pubmed_url = article.get("PubMed連結", "")
+    if pubmed_url:
+        links.append(f"[在 PubMed 查看]({escape(pubmed_url)})")
+    doi = article.get("DOI", "")
+    if doi:
+        links.append(f"[DOI: {escape(doi)}](https://doi.org/{escape(doi)})")
+    if links:
+        parts.append(" &nbsp;|&nbsp; ".join(links))
+
+    return "\n\n".join(parts)
+
+
+def _featured_columns(featured: list[dict]) -> dict:
+    """將重點文章轉為欄位式結構 (每個欄位一個陣列)，渲染時依索引取值"""
+    return {
+        "cards": [_featured_card_markdown(a) for a in featured],
+        "abstracts": [
+            "\n\n".join(
+                f"**{section}:** {content}"
+                for section, content in (a.get("結構化摘要", {}) or {}).items()
+            )
+            for a in featured
+        ],
+        "categories": np.array([a.get("類別") for a in featured], dtype=object)
+    }
+
+
+def _articles_table(articles: dict) -> pa.Table:
+    """將各類別文章攤平為 Arrow 表格 (只保留文章列表需要的欄位)，並附上類別名稱與小寫標題欄"""
+    category_articles = [
+        (data.get("name", cat), data.get("articles", []))
+        for cat, data in articles.items()
+    ]
+
+    table = pa.Table.from_pylist(
+        list(chain.from_iterable(category_list for _, category_list in category_articles)),
+        schema=_ARTICLE_TABLE_SCHEMA
+    )
+    table = table.append_column("類別", pa.array(
+        list(chain.from_iterable(
+            [cat_name] * len(category_list) for cat_name, category_list in category_articles
+        )),
+        type=pa.string()
+    ))
+    # 搜尋比對列表顯示的標題 (前 80 字) 的小寫，隨資料快取一起建立，不必每次重新執行時轉換
+    return table.append_column(
+        "title_lower", pc.utf8_lower(pc.utf8_slice_codeunits(table["title"], 0, 80))
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _load_cached_data_impl(
+    articles_mtime: Optional[int],
+    summary_mtime: Optional[int],
+    trends_mtime: Optional[int]
+):
+    """實際讀取資料檔；以各檔案的修改時間作為快取鍵值，檔案更新後自動重新讀取"""
     articles_path = os.path.join(DATA_DIR, ARTICLES_FILE)
     summary_path = os.path.join(DATA_DIR, SUMMARY_FILE)
     trends_path = os.path.join(DATA_DIR, TRENDS_FILE)
 
-    articles = {}
     summary = {}
     trends = {}
 
-    if os.path.exists(articles_path):
-        with open(articles_path, "r", encoding="utf-8") as f:
-            articles = json.load(f)
+    articles = load_articles_db(articles_path)
+
+    if summary_mtime is not None:
+        summary = load_json(summary_path)
+        summary["_重點文章欄位"] = _featured_columns(summary.get("重點文章", []))
+        for idea in summary.get("研究想法", []):
+            idea["想法_html"] = idea.get("想法", "").replace("\n", "<br>")
+
+    if trends_mtime is not None:
+        trends = load_json(trends_path)
+
+    return articles, summary, trends, _articles_table(articles)
+
 
-    if os.path.exists(summary_path):
-        with open(summary_path, "r", encoding="utf-8") as f:
-            summary = json.load(f)
+def _data_version() -> tuple:
+    """資料檔 (文章、摘要、趨勢) 的修改時間，作為快取鍵值"""
+    articles_path = os.path.join(DATA_DIR, ARTICLES_FILE)
+
+    # 資料庫不存在時 load_articles_db 會改讀同名的舊版 JSON
+    articles_mtime = _file_mtime(articles_path)
+    if articles_mtime is None:
+        articles_mtime = _file_mtime(os.path.splitext(articles_path)[0] + ".json")
+
+    return (
+        articles_mtime,
+        _file_mtime(os.path.join(DATA_DIR, SUMMARY_FILE)),
+        _file_mtime(os.path.join(DATA_DIR, TRENDS_FILE))
+    )
+
+
+def load_cached_data(version: Optional[tuple] = None):
+    """
+    載入快取的資料 (每次重新執行時只需 stat 檔案，內容未變更則直接取用快取)
 
-    if os.path.exists(trends_path):
-        with open(trends_path, "r", encoding="utf-8") as f:
-            trends = json.load(f)
+    Args:
+        version: _data_version() 的結果，未提供時重新取得
 
-    return articles, summary, trends
+    Returns:
+        (文章字典, 摘要, 趨勢, 文章列表 Arrow 表格)
+    """
+    if version is None:
+        version = _data_version()
+
+    return _load_cached_data_impl(*version)
 
 
 def fetch_new_articles(days_back: int, max_results: int, high_impact_only: bool):
     """抓取新文章"""
+    # 只在抓取時才需要，延後載入以加快只瀏覽快取資料時的啟動
+    from pubmed_fetcher import PubMedFetcher
+    from research_analyzer import ResearchAnalyzer
+
     with st.spinner("正在從 PubMed 抓取最新文獻..."):
         fetcher = PubMedFetcher()
         articles = fetcher.fetch_nephrology_articles(
@@ -114,8 +253,25 @@ def fetch_new_articles(days_back: int, max_results: int, high_impact_only: bool)
         )
         fetcher.save_articles(articles)
 
-        # 分析並生成摘要
         analyzer = ResearchAnalyzer(articles)
+
+        # 已儲存的趨勢與摘要記錄的文章指紋與本次相同時直接沿用，只更新日期與週期
+        summary_path = os.path.join(DATA_DIR, SUMMARY_FILE)
+        trends_path = os.path.join(DATA_DIR, TRENDS_FILE)
+        if os.path.exists(summary_path) and os.path.exists(trends_path):
+            fingerprint = analyzer.articles_fingerprint()
+            summary = load_json(summary_path)
+            trends = load_json(trends_path)
+            if summary.get("文章指紋") == fingerprint and trends.get("文章指紋") == fingerprint:
+                now = datetime.now().isoformat()
+                trends["分析日期"] = now
+                summary["報告日期"] = now
+                summary["報告週期"] = analyzer.report_period()
+                analyzer.save_trends(trends)
+                analyzer.save_summary(summary)
+                return articles, summary, trends
+
+        # 分析並生成摘要
         trends = analyzer.analyze_trends()
         analyzer.save_trends(trends)
 
@@ -125,7 +281,7 @@ def fetch_new_articles(days_back: int, max_results: int, high_impact_only: bool)
         return articles, summary, trends
 
 
-def render_sidebar():
+def render_sidebar(articles: dict, summary: dict):
     """渲染側邊欄"""
     st.sidebar.markdown("## 控制面板")
 
@@ -137,12 +293,11 @@ def render_sidebar():
 
     # 抓取按鈕
     if st.sidebar.button("抓取最新文獻", type="primary", use_container_width=True):
-        articles, summary, trends = fetch_new_articles(days_back, max_results, high_impact_only)
-        st.sidebar.success(f"成功抓取 {summary.get('執行摘要', {}).get('總文章數', 0)} 篇文章！")
+        _, new_summary, _ = fetch_new_articles(days_back, max_results, high_impact_only)
+        st.sidebar.success(f"成功抓取 {new_summary.get('執行摘要', {}).get('總文章數', 0)} 篇文章！")
         st.rerun()
 
     # 顯示上次更新時間
-    articles, summary, _ = load_cached_data()
     if summary:
         report_date = summary.get("報告日期", "")
         if report_date:
@@ -165,6 +320,7 @@ def render_sidebar():
     return selected_category
 
 
+@st.fragment
 def render_executive_summary(summary: dict):
     """渲染執行摘要"""
     st.markdown('<p class="main-header">腎臟學研究週報</p>', unsafe_allow_html=True)
@@ -198,6 +354,27 @@ def render_executive_summary(summary: dict):
             st.markdown(f"- {finding}")
 
 
+@st.cache_data(show_spinner=False)
+def _render_trend_tags_html(items: tuple) -> str:
+    """產生關鍵詞標籤 HTML；相同關鍵詞統計在重新執行時直接取用快取"""
+    return "".join(
+        f'<span class="trend-tag">{kw} ({count})</span> '
+        for kw, count in items
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _journal_chart_spec(items: tuple) -> dict:
+    """前 10 大期刊長條圖的 Vega-Lite 規格 (期刊分布不變時直接取用快取)"""
+    df = pd.DataFrame(items, columns=["期刊", "文章數"])
+    df = df.sort_values("文章數", ascending=True).tail(10)
+    return alt.Chart(df).mark_bar().encode(
+        x=alt.X("文章數:Q"),
+        y=alt.Y("期刊:N", sort="-x")
+    ).to_dict()
+
+
+@st.fragment
 def render_trends(summary: dict, trends: dict):
     """渲染研究趨勢"""
     st.markdown("## 研究趨勢分析")
@@ -211,17 +388,18 @@ def render_trends(summary: dict, trends: dict):
         st.markdown("### 熱門研究主題")
         hot_topics = research_trends.get("熱門主題", [])
         if hot_topics:
-            df = pd.DataFrame(hot_topics, columns=["主題", "文章數"])
-            st.bar_chart(df.set_index("主題"))
+            # 直接傳入 {欄位: {主題: 文章數}}，不另建 DataFrame
+            st.bar_chart({"文章數": dict(hot_topics)})
 
     with col2:
         # 期刊分布
         st.markdown("### 期刊分布")
         journal_dist = research_trends.get("期刊分布", {})
         if journal_dist:
-            df = pd.DataFrame(list(journal_dist.items()), columns=["期刊", "文章數"])
-            df = df.sort_values("文章數", ascending=True).tail(10)
-            st.bar_chart(df.set_index("期刊"))
+            st.vega_lite_chart(
+                spec=_journal_chart_spec(tuple(journal_dist.items())),
+                use_container_width=True
+            )
 
     # 趨勢關鍵詞
     st.markdown("### 趨勢關鍵詞")
@@ -233,9 +411,7 @@ def render_trends(summary: dict, trends: dict):
             with tab:
                 if keywords:
                     # 顯示關鍵詞標籤
-                    tags_html = ""
-                    for kw, count in list(keywords.items())[:15]:
-                        tags_html += f'<span class="trend-tag">{kw} ({count})</span> '
+                    tags_html = _render_trend_tags_html(tuple(islice(keywords.items(), 15)))
                     st.markdown(tags_html, unsafe_allow_html=True)
                 else:
                     st.info("本週無相關關鍵詞")
@@ -250,69 +426,37 @@ def render_trends(summary: dict, trends: dict):
             st.dataframe(df, use_container_width=True, hide_index=True)
 
 
+@st.fragment
 def render_featured_articles(summary: dict, selected_category: str):
     """渲染重點文章"""
     st.markdown("## 重點文章")
 
-    featured = summary.get("重點文章", [])
+    featured = summary.get("_重點文章欄位") or _featured_columns(summary.get("重點文章", []))
+    count = len(featured["cards"])
 
-    if not featured:
+    if not count:
         st.info("目前沒有文章資料。請點擊側邊欄的「抓取最新文獻」按鈕。")
         return
 
-    # 篩選類別
+    # 篩選類別 (以類別陣列向量化比對)
     if selected_category != "全部":
-        featured = [a for a in featured if selected_category in str(a)]
+        indices = np.flatnonzero(featured["categories"] == selected_category)
+    else:
+        indices = range(count)
 
-    for article in featured:
+    # 每篇文章只送出一個 Markdown 區塊 (加上摘要展開區)
+    for position, i in enumerate(indices):
         with st.container():
-            # 文章標題
-            title = article.get("標題", "無標題")
-            is_high_impact = article.get("是否高影響力期刊", False)
-
-            col1, col2 = st.columns([4, 1])
-            with col1:
-                st.markdown(f"#### {title}")
-            with col2:
-                if is_high_impact:
-                    st.markdown('<span class="high-impact-badge">高影響力期刊</span>', unsafe_allow_html=True)
-
-            # 文章資訊
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.markdown(f"**期刊:** {article.get('期刊', 'N/A')}")
-            with col2:
-                st.markdown(f"**研究類型:** {article.get('研究類型', 'N/A')}")
-            with col3:
-                st.markdown(f"**發表日期:** {article.get('發表日期', 'N/A')}")
-
-            # 摘要
-            structured_abstract = article.get("結構化摘要", {})
-            if structured_abstract:
-                with st.expander("查看摘要"):
-                    for section, content in structured_abstract.items():
-                        st.markdown(f"**{section}:** {content}")
-
-            # 相關趨勢
-            related_trends = article.get("相關趨勢", [])
-            if related_trends:
-                trends_html = " ".join([f'<span class="trend-tag">{t}</span>' for t in related_trends])
-                st.markdown(f"**相關趨勢:** {trends_html}", unsafe_allow_html=True)
-
-            # 連結
-            col1, col2 = st.columns(2)
-            with col1:
-                pubmed_url = article.get("PubMed連結", "")
-                if pubmed_url:
-                    st.markdown(f"[在 PubMed 查看]({pubmed_url})")
-            with col2:
-                doi = article.get("DOI", "")
-                if doi:
-                    st.markdown(f"[DOI: {doi}](https://doi.org/{doi})")
+            separator = "---\n\n" if position else ""
+            st.markdown(separator + featured["cards"][i], unsafe_allow_html=True)
 
-            st.markdown("---")
+            abstract_markdown = featured["abstracts"][i]
+            if abstract_markdown:
+                with st.expander("查看摘要"):
+                    st.markdown(abstract_markdown)
 
 
+@st.fragment
 def render_research_ideas(summary: dict):
     """渲染研究想法"""
     st.markdown("## 研究想法與建議")
@@ -340,13 +484,20 @@ def render_research_ideas(summary: dict):
                 <div class="idea-card">
                     <strong>{idea.get('關鍵詞', '')}</strong>
                     <br><br>
-                    {idea.get('想法', '').replace(chr(10), '<br>')}
+                    {idea.get('想法_html', '')}
                     <br><br>
                     <em>建議研究類型: {idea.get('建議研究類型', 'N/A')}</em>
                 </div>
                 """, unsafe_allow_html=True)
 
 
+@st.cache_data(show_spinner=False)
+def _mesh_df(items: tuple) -> pd.DataFrame:
+    """MeSH 詞彙頻率表 (詞彙內容不變時直接取用快取)"""
+    return pd.DataFrame(items, columns=["MeSH 詞彙", "頻率"])
+
+
+@st.fragment
 def render_mesh_analysis(summary: dict):
     """渲染 MeSH 詞彙分析"""
     st.markdown("## MeSH 詞彙分析")
@@ -360,60 +511,64 @@ def render_mesh_analysis(summary: dict):
     # 顯示前30個詞彙
     col1, col2 = st.columns(2)
 
-    items = list(mesh_terms.items())
-    half = len(items) // 2
+    df = _mesh_df(tuple(mesh_terms.items()))
+    half = len(df) // 2
 
     with col1:
-        df1 = pd.DataFrame(items[:half], columns=["MeSH 詞彙", "頻率"])
-        st.dataframe(df1, use_container_width=True, hide_index=True)
+        st.dataframe(df.iloc[:half], use_container_width=True, hide_index=True)
 
     with col2:
-        df2 = pd.DataFrame(items[half:], columns=["MeSH 詞彙", "頻率"])
-        st.dataframe(df2, use_container_width=True, hide_index=True)
+        st.dataframe(df.iloc[half:], use_container_width=True, hide_index=True)
 
 
-def render_all_articles(articles: dict, selected_category: str):
-    """渲染所有文章列表"""
-    st.markdown("## 完整文章列表")
+@st.cache_data(show_spinner=False, max_entries=8)
+def _df_to_csv_bytes(df_key: tuple, _df: pd.DataFrame) -> bytes:
+    """將文章表格轉為 CSV (UTF-8)；df_key 為 (資料版本, 類別, 搜尋字串)，可決定表格內容"""
+    return _df.to_csv(index=False).encode("utf-8")
 
-    all_articles = []
-    for cat, data in articles.items():
-        cat_name = data.get("name", cat)
-        for article in data.get("articles", []):
-            article["類別"] = cat_name
-            all_articles.append(article)
 
-    if not all_articles:
+@st.fragment
+def render_all_articles(articles_table: pa.Table, selected_category: str, version: tuple):
+    """渲染所有文章列表 (version 為 _data_version() 的結果)"""
+    st.markdown("## 完整文章列表")
+
+    if not articles_table.num_rows:
         st.info("目前沒有文章資料。")
         return
 
-    # 篩選
+    # 篩選 (在 Arrow 表格上先篩類別，只轉換保留的列)
     if selected_category != "全部":
-        all_articles = [a for a in all_articles if a.get("類別") == selected_category]
-
-    # 轉換為 DataFrame
-    df = pd.DataFrame([
-        {
-            "標題": a.get("title", "")[:80] + "..." if len(a.get("title", "")) > 80 else a.get("title", ""),
-            "期刊": a.get("journal", ""),
-            "類別": a.get("類別", ""),
-            "高影響力": "是" if a.get("is_high_impact") else "否",
-            "發表日期": a.get("pub_date", ""),
-            "PMID": a.get("pmid", "")
-        }
-        for a in all_articles
-    ])
-
-    # 搜尋功能
+        articles_table = articles_table.filter(
+            pc.equal(articles_table["類別"], selected_category)
+        )
+
+    has_articles = articles_table.num_rows > 0
+
+    # 搜尋功能 (以載入時建立的小寫標題欄做字面子字串比對，不經 regex)
     search_term = st.text_input("搜尋文章標題", "")
     if search_term:
-        df = df[df["標題"].str.contains(search_term, case=False, na=False)]
+        articles_table = articles_table.filter(pc.fill_null(
+            pc.match_substring(articles_table["title_lower"], search_term.lower()),
+            False
+        ))
+
+    # 轉換為 DataFrame (一次建立後以欄位運算轉換，不逐列組裝)
+    raw = articles_table.drop_columns("title_lower").to_pandas()
+    titles = raw["title"].fillna("")
+    df = pd.DataFrame({
+        "標題": titles.where(titles.str.len() <= 80, titles.str.slice(0, 80) + "..."),
+        "期刊": raw["journal"].fillna(""),
+        "類別": raw["類別"].fillna(""),
+        "高影響力": raw["is_high_impact"].fillna(False).astype(bool).map({True: "是", False: "否"}),
+        "發表日期": raw["pub_date"].fillna(""),
+        "PMID": raw["pmid"].fillna("")
+    })
 
     st.dataframe(df, use_container_width=True, hide_index=True)
 
     # 下載功能
-    if all_articles:
-        csv = df.to_csv(index=False).encode("utf-8")
+    if has_articles:
+        csv = _df_to_csv_bytes((version, selected_category, search_term), df)
         st.download_button(
             label="下載文章列表 (CSV)",
             data=csv,
@@ -427,11 +582,12 @@ def main():
     # 確保資料目錄存在
     os.makedirs(DATA_DIR, exist_ok=True)
 
-    # 渲染側邊欄
-    selected_category = render_sidebar()
+    # 載入資料 (側邊欄與各頁籤共用同一份)
+    version = _data_version()
+    articles, summary, trends, articles_table = load_cached_data(version)
 
-    # 載入資料
-    articles, summary, trends = load_cached_data()
+    # 渲染側邊欄
+    selected_category = render_sidebar(articles, summary)
 
     # 主要內容區域
     if summary:
@@ -459,7 +615,7 @@ def main():
             render_mesh_analysis(summary)
 
         with tab5:
-            render_all_articles(articles, selected_category)
+            render_all_articles(articles_table, selected_category, version)
 
     else:
         # 首次使用，顯示歡迎訊息